@@ -0,0 +1,456 @@
+"""Fetch-and-classify pipeline of the HTML Content Fetcher Actor.
+
+Fetches a page with HTTPX, classifies it as found or not found and extracts the
+eBay price, producing the result record that the Actor saves to its dataset.
+"""
+
+from __future__ import annotations
+
+import datetime
+import hashlib
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+
+# Hishel - An RFC 9111 compliant HTTP cache for HTTPX. Read more at:
+# https://hishel.com/
+import hishel
+
+# HTTP Core - The low-level transport under HTTPX, whose requests and responses hishel stores
+import httpcore
+
+# Apify SDK - A toolkit for building Apify Actors. Read more at:
+# https://docs.apify.com/sdk/python
+from apify import Actor
+from apify.storages import KeyValueStore
+
+# HTTPX - A library for making asynchronous HTTP requests in Python. Read more at:
+# https://www.python-httpx.org/
+from httpx import AsyncClient, AsyncHTTPTransport, HTTPError, Limits, Response, TimeoutException
+
+# Page analysis helpers, compiled with mypyc in the Docker image when possible
+from parsing import extract_price_from_html, is_not_found_page
+
+
+# Connection pool limits of the shared HTTP client
+HTTP_LIMITS = Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=30)
+
+# Compressions accepted from servers; httpx decodes Brotli and Zstandard through
+# its "brotli" and "zstd" extras (zstd support needs httpx 0.27.1 or later)
+ACCEPT_ENCODING = 'br, zstd, gzip'
+
+# Named key-value store holding the HTTP cache used when "use_cache" is enabled.
+# The run's container is discarded afterwards, so the cache cannot live on disk.
+HTTP_CACHE_STORE_NAME = 'http-cache'
+
+# Prefix of the key-value store keys under which cached HTTP responses are stored
+HTTP_CACHE_KEY_PREFIX = 'http-'
+
+# Named key-value store holding extracted prices; unlike the run's default store,
+# a named store persists across runs
+PRICE_CACHE_STORE_NAME = 'price-cache'
+
+# Prefix of the key-value store keys under which extracted prices are cached
+PRICE_CACHE_KEY_PREFIX = 'price-'
+
+# Marker of the eBay price element, used to detect when enough of a streamed page has arrived
+PRICE_MARKER = b'x-price-primary'
+
+# Size of the chunks read from streamed responses
+STREAM_CHUNK_SIZE = 65536
+
+# Bytes that must follow the price marker before a partial page is parsed, so the
+# price element is not cut off in the middle
+PRICE_LOOKAHEAD_BYTES = 8192
+
+# Shape of every result record; fields not set by a branch keep these defaults
+_BASE_RESULT: Dict[str, Any] = {
+    'success': False,
+    'error': None,
+    'url': None,
+    'final_url': None,
+    'html_content': None,
+    'price': None,
+    'price_found': False,
+    'status_code': None,
+    'headers': None,
+    'content_length': None,
+    'content_type': None,
+    'page_exists': False
+}
+
+
+def make_result(**fields: Any) -> Dict[str, Any]:
+    """Build a result record from the base template.
+    
+    Args:
+        **fields: The fields that differ from the defaults in the template
+        
+    Returns:
+        A new result record with every field present
+    """
+    result = _BASE_RESULT.copy()
+    result.update(fields)
+    return result
+
+
+def _decode_body(html_content: bytes, response: Response) -> str:
+    """Decode a response body to text, for the results that include the HTML content.
+    
+    Args:
+        html_content: The raw HTML content
+        response: The response the content was read from
+        
+    Returns:
+        The HTML content decoded with the charset declared by the response, or
+        UTF-8 when it declares none or an unknown one
+    """
+    return html_content.decode(response.encoding or 'utf-8', 'replace')
+
+
+def _price_cache_key(url: str) -> str:
+    """Build the key-value store key under which the result for a URL is cached.
+    
+    Args:
+        url: The requested URL
+        
+    Returns:
+        A key that is valid in the Apify key-value store
+    """
+    return PRICE_CACHE_KEY_PREFIX + hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+async def _get_cached_result(price_cache: KeyValueStore, url: str, cache_ttl: int) -> Optional[Dict[str, Any]]:
+    """Look up a cached result for a URL, treating any problem as a cache miss.
+    
+    Args:
+        price_cache: Key-value store holding previously extracted prices
+        url: The requested URL
+        cache_ttl: How long (in seconds) a cached price stays valid
+        
+    Returns:
+        The cached result record, or None if there is no fresh, well-formed entry
+    """
+    try:
+        cached = await price_cache.get_value(_price_cache_key(url))
+        if cached and time.time() - cached['t'] < cache_ttl:
+            return cached['result']
+    except Exception as e:
+        Actor.log.warning(f'Ignoring price cache entry for {url}: {e!r}')
+    return None
+
+
+async def _set_cached_result(price_cache: KeyValueStore, url: str, result: Dict[str, Any]) -> None:
+    """Store the result for a URL, without failing the request if storage fails.
+    
+    Args:
+        price_cache: Key-value store holding previously extracted prices
+        url: The requested URL
+        result: The result record to cache
+    """
+    try:
+        await price_cache.set_value(_price_cache_key(url), {'t': time.time(), 'result': result})
+    except Exception as e:
+        Actor.log.warning(f'Could not cache the price for {url}: {e!r}')
+
+
+async def _read_response(response: Response) -> Tuple[bytes, Optional[str], bool]:
+    """Read the body of a streamed response, stopping early once the price is found.
+    
+    Successful responses are consumed chunk by chunk and the download is abandoned
+    as soon as the price element has been received and extracted, provided the
+    received prefix does not look like a "not found" page. Any other response, or
+    a page without a price, is read in full.
+    
+    With "use_cache" enabled, the hishel transport reads and stores the whole body
+    before the response is returned, so stopping early saves no download there.
+    
+    Args:
+        response: The streamed HTTPX response
+        
+    Returns:
+        A tuple of the raw HTML content, the extracted price (or None if no price
+        was found while reading), and whether the content is only a prefix of the
+        page whose "not found" check has already passed
+    """
+    if response.status_code != 200:
+        return await response.aread(), None, False
+    
+    buffer = bytearray()
+    price_attempted = False
+    
+    async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+        buffer += chunk
+        if price_attempted:
+            continue
+        
+        marker_pos = buffer.find(PRICE_MARKER)
+        if marker_pos != -1 and len(buffer) - marker_pos >= PRICE_LOOKAHEAD_BYTES:
+            # Only try once on the partial page; on a miss the full page is parsed later
+            price_attempted = True
+            html_bytes = bytes(buffer)
+            extracted_price = extract_price_from_html(html_bytes)
+            # Stopping early means the "not found" check only ever sees this prefix,
+            # through the usual head+tail window with the end of the prefix standing
+            # in for the document's tail: an indicator between the two, or past the
+            # prefix, goes unnoticed. If the prefix itself looks like an error page,
+            # read on so the full body is classified instead.
+            if extracted_price and not is_not_found_page(html_bytes, response.status_code):
+                # Leaving the stream context closes the connection without reading the rest
+                return html_bytes, extracted_price, True
+    
+    return bytes(buffer), None, False
+
+
+class KeyValueStoreCacheStorage(hishel.AsyncBaseStorage):
+    """Hishel storage keeping cached HTTP responses in an Apify key-value store.
+    
+    Backed by a named store, cached responses persist across runs, so a later run
+    can revalidate them and get a 304 Not Modified instead of the whole page.
+    """
+    
+    def __init__(self, store: KeyValueStore, serializer: Optional[hishel.BaseSerializer] = None) -> None:
+        super().__init__(serializer)
+        self._store = store
+    
+    async def store(
+        self,
+        key: str,
+        response: httpcore.Response,
+        request: httpcore.Request,
+        metadata: Optional[hishel.Metadata] = None
+    ) -> None:
+        metadata = metadata or hishel.Metadata(
+            cache_key=key, created_at=datetime.datetime.now(datetime.timezone.utc), number_of_uses=0
+        )
+        await self._store.set_value(
+            HTTP_CACHE_KEY_PREFIX + key,
+            self._serializer.dumps(response=response, request=request, metadata=metadata)
+        )
+    
+    async def remove(self, key: Union[str, httpcore.Response]) -> None:
+        if isinstance(key, httpcore.Response):
+            key = key.extensions['cache_metadata']['cache_key']
+        # Setting a record to None deletes it
+        await self._store.set_value(HTTP_CACHE_KEY_PREFIX + key, None)
+    
+    async def update_metadata(
+        self,
+        key: str,
+        response: httpcore.Response,
+        request: httpcore.Request,
+        metadata: hishel.Metadata
+    ) -> None:
+        await self.store(key, response, request, metadata)
+    
+    async def retrieve(self, key: str) -> Optional[Tuple[httpcore.Response, httpcore.Request, hishel.Metadata]]:
+        data = await self._store.get_value(HTTP_CACHE_KEY_PREFIX + key)
+        if not data:
+            return None
+        return self._serializer.loads(data)
+    
+    async def aclose(self) -> None:
+        return
+
+
+def create_client(
+    timeout: int,
+    follow_redirects: bool,
+    user_agent: str,
+    http_cache: Optional[KeyValueStore] = None
+) -> AsyncClient:
+    """Create the HTTPX client used to fetch pages.
+    
+    Args:
+        timeout: The request timeout in seconds
+        follow_redirects: Whether to automatically follow HTTP redirects
+        user_agent: The User-Agent header sent with every request
+        http_cache: Key-value store backing the HTTP cache, or None to disable it
+        
+    Returns:
+        A new client; the caller is responsible for closing it
+    """
+    # Optionally route requests through an HTTP cache, which revalidates stored
+    # responses with If-None-Match / If-Modified-Since
+    transport = None
+    if http_cache is not None:
+        transport = hishel.AsyncCacheTransport(
+            transport=AsyncHTTPTransport(http2=True, limits=HTTP_LIMITS),
+            storage=KeyValueStoreCacheStorage(http_cache),
+            # Store pages that carry only validators (no explicit freshness), and
+            # always revalidate them so a changed page is never served from the cache
+            controller=hishel.Controller(allow_heuristics=True, always_revalidate=True)
+        )
+    
+    return AsyncClient(
+        http2=True,
+        timeout=timeout,
+        follow_redirects=follow_redirects,
+        headers={'User-Agent': user_agent, 'Accept-Encoding': ACCEPT_ENCODING},
+        limits=HTTP_LIMITS,
+        transport=transport
+    )
+
+
+async def fetch_and_extract(
+    url: str,
+    timeout: int,
+    follow_redirects: bool,
+    user_agent: str,
+    client: Optional[AsyncClient] = None,
+    *,
+    price_cache: Optional[KeyValueStore] = None,
+    cache_ttl: int = 0
+) -> Dict[str, Any]:
+    """Fetch a single URL, classify the page and extract its price.
+    
+    Args:
+        url: The URL to fetch
+        timeout: The request timeout in seconds
+        follow_redirects: Whether to automatically follow HTTP redirects
+        user_agent: The User-Agent header sent with the request
+        client: A client shared with other requests; a temporary one is created if None
+        price_cache: Key-value store holding previously extracted prices, if enabled
+        cache_ttl: How long (in seconds) a cached price stays valid
+        
+    Returns:
+        The result record describing the fetched page or the error
+    """
+    if client is None:
+        async with create_client(timeout, follow_redirects, user_agent) as own_client:
+            return await fetch_and_extract(
+                url, timeout, follow_redirects, user_agent, own_client,
+                price_cache=price_cache, cache_ttl=cache_ttl
+            )
+    
+    # Return a recently extracted price for the same URL without fetching the page
+    if price_cache is not None:
+        cached_result = await _get_cached_result(price_cache, url, cache_ttl)
+        if cached_result is not None:
+            Actor.log.info(f'Returning cached price for: {url}')
+            return cached_result
+    
+    Actor.log.info(f'Fetching HTML content from: {url}')
+    
+    try:
+        # Fetch the HTML content of the page, stopping early once the price is received
+        async with client.stream('GET', url) as response:
+            html_bytes, extracted_price, truncated = await _read_response(response)
+        
+        # Extract response data first (before raising for status)
+        status_code = response.status_code
+        content_type = response.headers.get('content-type', 'unknown')
+        final_url = str(response.url)
+        
+        Actor.log.info(f'Response received for {url} from {final_url}')
+        Actor.log.info(f'Status code for {url}: {status_code}')
+        Actor.log.info(f"Content encoding for {url}: {response.headers.get('content-encoding', 'identity')}")
+        Actor.log.info(f'Content length for {url}: {len(html_bytes)} bytes')
+        
+        # Handle specific status codes
+        if status_code == 404:
+            Actor.log.warning(f'Page not found (404): {url}')
+            return make_result(
+                error='Page not found (404)',
+                url=url,
+                final_url=final_url,
+                status_code=status_code,
+                content_type=content_type
+            )
+        
+        elif status_code in [403, 410, 451]:  # Forbidden, Gone, Unavailable for Legal Reasons
+            error_msg = f'Page unavailable (HTTP {status_code})'
+            Actor.log.warning(f'{error_msg}: {url}')
+            return make_result(
+                error=error_msg,
+                url=url,
+                final_url=final_url,
+                status_code=status_code,
+                content_type=content_type
+            )
+        
+        elif status_code >= 400:
+            error_msg = f'Client/Server error (HTTP {status_code})'
+            Actor.log.error(f'{error_msg}: {url}')
+            html_content = _decode_body(html_bytes, response) if len(html_bytes) < 10000 else None  # Include short error pages
+            return make_result(
+                error=error_msg,
+                url=url,
+                final_url=final_url,
+                html_content=html_content,
+                status_code=status_code,
+                content_length=len(html_content) if html_content is not None else None,
+                content_type=content_type
+            )
+        
+        # Check for common "not found" indicators in the content, unless its prefix
+        # was already checked while streaming
+        if not truncated and is_not_found_page(html_bytes, status_code):
+            Actor.log.warning(f'Page appears to be a "not found" or error page based on content: {url}')
+            return make_result(
+                error='Page not found or unavailable (detected from content)',
+                url=url,
+                final_url=final_url,
+                status_code=status_code,
+                content_type=content_type
+            )
+        
+        Actor.log.info(f'Page successfully loaded and appears to be valid: {url}')
+        
+        # Try to extract price from the HTML content unless it was found while streaming
+        if extracted_price is None:
+            extracted_price = extract_price_from_html(html_bytes)
+        
+        if extracted_price:
+            Actor.log.info(f'Price found for {url}: {extracted_price}')
+            # Price found - return structured data without HTML content
+            result = make_result(
+                success=True,
+                url=url,
+                final_url=final_url,
+                price=extracted_price,
+                price_found=True,
+                status_code=status_code,
+                content_type=content_type,
+                page_exists=True
+            )
+        else:
+            Actor.log.info(f'No price found in the expected format: {url}')
+            # No price found - return full HTML content
+            html_content = _decode_body(html_bytes, response)
+            headers = dict(response.headers)
+            result = make_result(
+                success=True,
+                url=url,
+                final_url=final_url,
+                html_content=html_content,
+                status_code=status_code,
+                headers=headers,
+                content_length=len(html_content),
+                content_type=content_type,
+                page_exists=True
+            )
+        
+        # Remember the extracted price for later runs on the same URL
+        if price_cache is not None and extracted_price:
+            await _set_cached_result(price_cache, url, result)
+        
+        return result
+
+    except TimeoutException:
+        error_msg = f'Request timeout after {timeout} seconds'
+        Actor.log.error(f'{error_msg}: {url}')
+        return make_result(error=error_msg, url=url)
+
+    except HTTPError as e:
+        error_msg = f'HTTP error occurred: {str(e)}'
+        Actor.log.error(f'{error_msg}: {url}')
+        return make_result(
+            error=error_msg,
+            url=url,
+            status_code=getattr(e.response, 'status_code', None) if hasattr(e, 'response') else None
+        )
+
+    except Exception as e:
+        error_msg = f'Unexpected error occurred: {str(e)}'
+        Actor.log.error(f'{error_msg}: {url}')
+        return make_result(error=error_msg, url=url)
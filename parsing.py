@@ -0,0 +1,251 @@
+"""Page analysis helpers for the HTML Content Fetcher Actor.
+
+These functions run on every fetched page: extracting the eBay price and
+detecting "not found" pages from the content. They are kept free of Apify and
+HTTPX dependencies so the module can be compiled ahead of time with mypyc, read
+more at: https://mypyc.readthedocs.io/
+"""
+
+from __future__ import annotations
+
+import html
+import logging
+import re
+from typing import Any, Optional
+
+# pyahocorasick - Aho-Corasick automaton for fast multi-pattern string search. Read more at:
+# https://pyahocorasick.readthedocs.io/
+import ahocorasick
+
+# Hyperscan - Intel's SIMD regex engine, used when available (x86-64 only). Read more at:
+# https://python-hyperscan.readthedocs.io/
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None  # type: ignore
+
+# RE2 - Google's linear-time regex engine, used when available instead of the
+# backtracking stdlib engine. Read more at: https://github.com/google/re2/tree/main/python
+try:
+    import re2 as re_engine
+except ImportError:
+    re_engine = re  # type: ignore
+
+# selectolax - Fast HTML5 parser with CSS selectors, backed by the Lexbor C engine. Read more at:
+# https://selectolax.readthedocs.io/
+from selectolax.lexbor import LexborHTMLParser
+
+# The logger behind Actor.log, looked up by name so this module does not depend on the Apify SDK
+logger = logging.getLogger('apify')
+
+# Runs of tag attributes and of attribute values in the patterns below. RE2 matches
+# in linear time whatever the pattern, but the backtracking stdlib engine takes
+# polynomial time on a crafted tag with unbounded runs, so they are bounded for it.
+if re_engine is re:
+    _ATTRS = rb'[^>]{0,500}'
+    _VALUE = rb'[^"]{0,200}'
+else:
+    _ATTRS = rb'[^>]*'
+    _VALUE = rb'[^"]*'
+
+# Fast path for the eBay price markup, matched directly on the raw bytes. The gap
+# between the price div and its span may not contain "</div", so a div without a
+# price span cannot pull in an unrelated span further down the page; RE2 has no
+# lookahead, hence the explicit alternation. The gap is also kept short enough for
+# RE2 to match it with its DFA.
+# Flags are inline since RE2 and the stdlib engine take different compile options.
+_PRICE_RE = re_engine.compile(
+    rb'(?s)<div' + _ATTRS + rb'class="' + _VALUE + rb'x-price-primary' + _VALUE + rb'"'
+    + _ATTRS + rb'data-testid="x-price-primary"' + _ATTRS + rb'>'
+    rb'(?:[^<]|<[^/]|</[^d]|</d[^i]|</di[^v]){0,300}?'
+    rb'<span' + _ATTRS + rb'class="' + _VALUE + rb'ux-textspans' + _VALUE + rb'"' + _ATTRS + rb'>([^<]+)</span>'
+)
+
+
+def extract_price_from_html(html_content: bytes) -> Optional[str]:
+    """Extract price from raw HTML content.
+    
+    Specifically looks for div elements with class 'x-price-primary' and 
+    data-testid 'x-price-primary' to extract price information. A compiled
+    regex is tried first; selectolax (Lexbor backend) is only used when it misses.
+    
+    Args:
+        html_content: The raw HTML content to parse
+        
+    Returns:
+        The extracted price as a string, or None if not found
+    """
+    try:
+        match = _PRICE_RE.search(html_content)
+        if match:
+            price_text = html.unescape(match.group(1).decode('utf-8', 'replace')).strip()
+            if price_text:
+                return price_text
+        
+        tree = LexborHTMLParser(html_content)
+        
+        # Look for the price span inside the element with specific class and data-testid
+        price_span = tree.css_first('div.x-price-primary[data-testid="x-price-primary"] span.ux-textspans')
+        if price_span:
+            price_text = price_span.text(strip=True)
+            if price_text:
+                return price_text
+        
+        # Alternative: look for the price span inside any element with x-price-primary class
+        price_span = tree.css_first('.x-price-primary span.ux-textspans')
+        if price_span:
+            price_text = price_span.text(strip=True)
+            if price_text:
+                return price_text
+        
+        # Fallback: get any text from the price element
+        price_element = tree.css_first('.x-price-primary')
+        if price_element:
+            price_text = price_element.text(strip=True)
+            if price_text:
+                return price_text
+                
+        return None
+        
+    except (AttributeError, ValueError) as e:
+        # Log the error but don't fail the entire request
+        logger.debug('price extract failed: %r (html_len=%d)', e, len(html_content))
+        return None
+
+
+# Common indicators of "not found" pages
+NOT_FOUND_INDICATORS = (
+    'page not found',
+    'item not found',
+    'product not found',
+    'listing not found',
+    '404 error',
+    'page does not exist',
+    'item no longer available',
+    'this listing has ended',
+    'listing has been removed',
+    'item has been removed',
+    'no longer available',
+    'page unavailable',
+    'item unavailable',
+    'access denied',
+    'forbidden',
+    'page not available'
+)
+
+# eBay specific indicators
+EBAY_NOT_FOUND_INDICATORS = (
+    'we looked everywhere',
+    "couldn't find that page",
+    'listing was ended',
+    'item you requested could not be found',
+    'this listing is no longer available',
+    'item has ended',
+    'page cannot be found'
+)
+
+ALL_INDICATORS = NOT_FOUND_INDICATORS + EBAY_NOT_FOUND_INDICATORS
+
+# Indicators of common error page titles
+TITLE_INDICATORS = ('404', 'not found', 'error', 'unavailable', 'forbidden')
+
+# Page title, looked up in the beginning of the document only
+_TITLE_RE = re_engine.compile(rb'(?is)<title' + _ATTRS + rb'>([^<]{0,300})</title>')
+
+# Portion of large documents inspected for indicators (see is_not_found_page)
+SCAN_HEAD_BYTES = 32768
+SCAN_TAIL_BYTES = 8192
+
+# Aho-Corasick automaton matching all indicators in a single pass over the content
+_NF_AC = ahocorasick.Automaton()
+for _index, _indicator in enumerate(ALL_INDICATORS):
+    _NF_AC.add_word(_indicator, _index)
+_NF_AC.make_automaton()
+
+# Case-insensitive Hyperscan database, preferred over the automaton when available
+# since it scans the raw bytes without building a lowercased copy of the content
+_NF_HS: Optional[Any] = None
+if hyperscan is not None:
+    _NF_HS = hyperscan.Database()
+    _NF_HS.compile(
+        expressions=[re.escape(indicator).encode() for indicator in ALL_INDICATORS],
+        ids=list(range(len(ALL_INDICATORS))),
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(ALL_INDICATORS),
+    )
+
+
+def _contains_not_found_indicator(html_content: bytes) -> bool:
+    """Check whether the content contains any of the "not found" indicators.
+    
+    Args:
+        html_content: The raw HTML content to scan
+        
+    Returns:
+        True if at least one indicator is present (case-insensitive), False otherwise
+    """
+    if _NF_HS is not None:
+        matched = False
+        
+        def on_match(match_id: int, start: int, end: int, flags: int, context: Any) -> bool:
+            nonlocal matched
+            matched = True
+            # Returning True stops the scan at the first match
+            return True
+        
+        try:
+            _NF_HS.scan(html_content, match_event_handler=on_match)
+        except hyperscan.ScanTerminated:
+            # Raised when on_match stops the scan, i.e. an indicator was found
+            return True
+        return matched
+    
+    # Convert to lowercase for case-insensitive matching; the indicators are ASCII,
+    # so a 1:1 latin-1 decode is enough to feed the automaton
+    content_lower = html_content.lower().decode('latin-1')
+    for _ in _NF_AC.iter(content_lower):
+        return True
+    return False
+
+
+def is_not_found_page(html_content: bytes, status_code: int) -> bool:
+    """Check if the page appears to be a 'not found' or error page based on content.
+    
+    Args:
+        html_content: The raw HTML content to analyze
+        status_code: The HTTP status code
+        
+    Returns:
+        True if the page appears to be a "not found" page, False otherwise
+    """
+    try:
+        # Only scan the head and tail of large documents. Error messages show up in
+        # the page title and the visible body text, which sit near the start of the
+        # markup, while the middle of big listing pages is mostly scripts and styles.
+        # This trades the (rare) indicator buried mid-document for scanning a small
+        # fixed window instead of the whole page.
+        if len(html_content) > SCAN_HEAD_BYTES + SCAN_TAIL_BYTES + 4096:
+            window = html_content[:SCAN_HEAD_BYTES] + b'\n' + html_content[-SCAN_TAIL_BYTES:]
+        else:
+            window = html_content
+        
+        # Check for indicators in the content, stopping at the first match
+        if _contains_not_found_indicator(window):
+            return True
+        
+        # Check if the page is unusually short (likely an error page)
+        if len(html_content.strip()) < 500 and status_code == 200:
+            return True
+            
+        # Check for common error page titles; <title> lives in the head, so
+        # only the beginning of the document needs to be searched
+        match = _TITLE_RE.search(html_content[:8192])
+        if match:
+            title_text = match.group(1).decode('utf-8', 'ignore').lower()
+            if any(indicator in title_text for indicator in TITLE_INDICATORS):
+                return True
+                    
+        return False
+        
+    except Exception:
+        # If we can't parse the content, assume it's valid
+        return False
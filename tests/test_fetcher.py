@@ -0,0 +1,132 @@
+"""Tests for the fetch-and-classify pipeline."""
+
+import asyncio
+
+import httpx
+
+import fetcher
+
+
+HEAD = b'<html><head><title>Item</title></head><body>'
+PRICE = (
+    b'<div class="x-price-primary" data-testid="x-price-primary">'
+    b'<span class="ux-textspans">US $10.00</span></div>'
+)
+PADDING = b'<p>' + b'lorem ipsum ' * 100 + b'</p>'
+
+
+def read(status_code, body):
+    """Stream a body through _read_response, returning its result and the bytes sent."""
+    sent = []
+    
+    async def stream():
+        for start in range(0, len(body), fetcher.STREAM_CHUNK_SIZE):
+            chunk = body[start:start + fetcher.STREAM_CHUNK_SIZE]
+            sent.append(len(chunk))
+            yield chunk
+    
+    def handler(request):
+        return httpx.Response(status_code, content=stream(), headers={'content-type': 'text/html'})
+    
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            async with client.stream('GET', 'https://example.com/') as response:
+                return await fetcher._read_response(response)
+    
+    return asyncio.run(run()), sum(sent)
+
+
+def test_download_stops_once_price_is_found():
+    body = HEAD + PRICE + PADDING * 1000 + b'</body></html>'
+    (html_bytes, price, truncated), sent = read(200, body)
+    assert price == 'US $10.00'
+    assert truncated
+    assert len(html_bytes) < len(body)
+    assert sent < len(body)
+
+
+def test_error_looking_prefix_is_read_in_full():
+    body = HEAD + b'This listing has ended' + PRICE + PADDING * 1000 + b'</body></html>'
+    (html_bytes, price, truncated), _ = read(200, body)
+    assert html_bytes == body
+    assert price is None
+    assert not truncated
+
+
+def test_marker_without_lookahead_is_read_in_full():
+    body = HEAD + PADDING * 60 + PRICE + b'</body></html>'
+    (html_bytes, price, truncated), _ = read(200, body)
+    assert html_bytes == body
+    assert price is None
+    assert not truncated
+
+
+def test_non_200_response_is_read_in_full():
+    body = HEAD + PRICE + PADDING * 1000 + b'</body></html>'
+    (html_bytes, price, truncated), _ = read(404, body)
+    assert html_bytes == body
+    assert price is None
+    assert not truncated
+
+
+class FakeKeyValueStore:
+    """In-memory stand-in for an Apify key-value store."""
+    
+    def __init__(self):
+        self.records = {}
+    
+    async def get_value(self, key):
+        return self.records.get(key)
+    
+    async def set_value(self, key, value):
+        if value is None:
+            self.records.pop(key, None)
+        else:
+            self.records[key] = value
+
+
+def test_http_cache_revalidates_across_clients(monkeypatch):
+    body = HEAD + PRICE + b'</body></html>'
+    seen_etags = []
+    
+    def handler(request):
+        seen_etags.append(request.headers.get('if-none-match'))
+        if request.headers.get('if-none-match') == '"v1"':
+            return httpx.Response(304, headers={'etag': '"v1"'})
+        return httpx.Response(200, content=body, headers={'content-type': 'text/html', 'etag': '"v1"'})
+    
+    # Route the cache transport to the mock server instead of the network
+    monkeypatch.setattr(fetcher, 'AsyncHTTPTransport', lambda **kwargs: httpx.MockTransport(handler))
+    store = FakeKeyValueStore()
+    
+    async def fetch():
+        # A new client per fetch, as each Actor run creates its own
+        async with fetcher.create_client(30, True, 'test', store) as client:
+            async with client.stream('GET', 'https://example.com/') as response:
+                return response.status_code, await response.aread(), response.extensions.get('from_cache')
+    
+    assert asyncio.run(fetch()) == (200, body, False)
+    assert asyncio.run(fetch()) == (200, body, True)
+    assert seen_etags == [None, '"v1"']
+
+
+def test_ended_listing_item_page_is_not_found():
+    # A full item page (large, with the item page state) whose listing has ended
+    body = (
+        HEAD + b'<script>window.itemPageState = {};</script>'
+        + b'<div class="banner">This listing was ended by the seller because the item is no longer available.</div>'
+        + PRICE + PADDING * 270 + b'</body></html>'
+    )
+    assert len(body) > 300_000
+    
+    def handler(request):
+        return httpx.Response(200, content=body, headers={'content-type': 'text/html; charset=utf-8'})
+    
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await fetcher.fetch_and_extract('https://example.com/', 30, True, 'test', client)
+    
+    result = asyncio.run(run())
+    assert not result['success']
+    assert not result['page_exists']
+    assert result['price'] is None
@@ -0,0 +1,77 @@
+"""Tests for the page analysis helpers."""
+
+import importlib.util
+import re
+import sys
+import time
+
+import pytest
+
+import parsing
+
+
+PADDING = b'<p>' + b'lorem ipsum ' * 100 + b'</p>'
+
+
+@pytest.fixture(params=['hyperscan', 'ahocorasick'])
+def matcher(request, monkeypatch):
+    """Run the test with each indicator matcher."""
+    if request.param == 'hyperscan':
+        if parsing._NF_HS is None:
+            pytest.skip('hyperscan is not installed')
+    else:
+        monkeypatch.setattr(parsing, '_NF_HS', None)
+    return request.param
+
+
+@pytest.mark.parametrize('text', [b'Page Not Found', b'We looked everywhere.', b'This listing has ended'])
+def test_not_found_indicator_detected(matcher, text):
+    html_content = b'<html><head><title>Item</title></head><body>' + PADDING + text + b'</body></html>'
+    assert parsing.is_not_found_page(html_content, 200)
+
+
+def test_valid_page_not_flagged(matcher):
+    html_content = b'<html><head><title>Item</title></head><body>' + PADDING + b'</body></html>'
+    assert not parsing.is_not_found_page(html_content, 200)
+
+
+def test_price_extracted_from_price_span():
+    html_content = (
+        b'<div class="x-price-primary" data-testid="x-price-primary">'
+        b'<span class="ux-textspans">US &#36;24.99</span></div>'
+    )
+    assert parsing.extract_price_from_html(html_content) == 'US $24.99'
+
+
+def test_price_regex_does_not_leave_the_price_div():
+    html_content = (
+        b'<div class="x-price-primary" data-testid="x-price-primary">$9</div>'
+        b'<p>x</p><span class="ux-textspans">Shipping</span>'
+    )
+    assert parsing.extract_price_from_html(html_content) == '$9'
+
+
+@pytest.fixture
+def stdlib_parsing(monkeypatch):
+    """A copy of the parsing module compiled with the stdlib regex engine."""
+    monkeypatch.setitem(sys.modules, 're2', None)
+    spec = importlib.util.find_spec('parsing')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    assert module.re_engine is re
+    return module
+
+
+def test_stdlib_price_regex_is_bounded_on_crafted_tag(stdlib_parsing):
+    html_content = b'<div ' + b'class="x-price-primary" ' * 20000 + b'>'
+    start = time.perf_counter()
+    assert stdlib_parsing._PRICE_RE.search(html_content) is None
+    assert time.perf_counter() - start < 1
+
+
+def test_stdlib_price_regex_extracts_price(stdlib_parsing):
+    html_content = (
+        b'<div class="x-price-primary" data-testid="x-price-primary">'
+        b'<span class="ux-textspans">US $24.99</span></div>'
+    )
+    assert stdlib_parsing.extract_price_from_html(html_content) == 'US $24.99'